@@ -11,6 +11,8 @@ arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
 
 try:
     # ----------------------------------------------------------------------
@@ -146,7 +148,7 @@ try:
     # 2. DISSOLVE LANDSCAPE POLYGONS BY CATEGORY
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Dissolving the landscape polygons by category...")
-    arcpy.management.Dissolve(landscape_fl, dissolved_fl, landscape_attr)
+    arcpy.analysis.PairwiseDissolve(landscape_fl, dissolved_fl, landscape_attr)
 
     # ----------------------------------------------------------------------
     # 3. SPATIAL JOIN: count dissolved polygons intersecting each grid cell
@@ -169,9 +171,7 @@ try:
 
     # 4.2. Read min/max values
     with arcpy.da.SearchCursor(stats_table, ["MIN_Join_Count", "MAX_Join_Count"]) as cursor:
-        for row in cursor:
-            min_Join_Count = float(row[0])
-            max_Join_Count = float(row[1])
+        min_Join_Count, max_Join_Count = map(float, next(cursor))
 
     # 4.3. Delete temporary in_memory table
     arcpy.management.Delete(stats_table)
@@ -10,6 +10,8 @@ arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
 
 try:
     # ----------------------------------------------------------------------
@@ -153,7 +155,7 @@ try:
     # 2. INTERSECT LANDSCAPE POLYGONS WITH GRID FL (creates intersect_fc containing FID_<grid> for grouping)
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Intersecting landscape polygons with the analytical grid...")
-    arcpy.analysis.Intersect([landscape_fl, grid_fl], intersect_fc,"ALL")
+    arcpy.analysis.PairwiseIntersect([landscape_fl, grid_fl], intersect_fc,"ALL")
 
     # ----------------------------------------------------------------------
     # 3. MULTIPART → SINGLEPART (create mts_fc - ..._Ne_MtS FC)
@@ -188,9 +190,7 @@ try:
 
     # 6.2. Read min/max values
     with arcpy.da.SearchCursor(stats_table, ["MIN_SUM_Count", "MAX_SUM_Count"]) as cursor:
-        for row in cursor:
-            min_SUM_Count = float(row[0])
-            max_SUM_Count = float(row[1])
+        min_SUM_Count, max_SUM_Count = map(float, next(cursor))
 
     # 6.3. Delete temporary in_memory table
     arcpy.management.Delete(stats_table)
@@ -11,6 +11,8 @@ arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
 
 try:
     # ----------------------------------------------------------------------
@@ -150,7 +152,7 @@ try:
     # 2. INTERSECT LANDSCAPE POLYGONS WITH GRID FL (creates intersect_fc containing FID_<grid> for grouping)
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Intersecting landscape polygons with the analytical grid...")
-    arcpy.analysis.Intersect([landscape_fl, grid_fl], out_intersect_fc, "ALL", "", "INPUT")
+    arcpy.analysis.PairwiseIntersect([landscape_fl, grid_fl], out_intersect_fc, "ALL", "", "INPUT")
 
     arcpy.AddMessage(">>> INTERSECT FINISHED")
 
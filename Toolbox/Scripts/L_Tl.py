@@ -5,12 +5,15 @@
 # 2026-01-26
 
 import arcpy
+import numpy as np
 
 # Allow overwrite
 arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
 
 try:
     # ----------------------------------------------------------------------
@@ -18,6 +21,8 @@ try:
     # ----------------------------------------------------------------------
     landscape_fl = arcpy.GetParameterAsText(0)      # Line feature layer
     grid_fl = arcpy.GetParameterAsText(1)           # Analytical grid layer
+    # grid_id_field is read to keep the toolbox parameter order; results are
+    # joined on the grid ObjectID, so the field itself is not used
     grid_id_field = arcpy.GetParameterAsText(2)     # Grid ID (usually OBJECTID)
     null_handling_mode = arcpy.GetParameterAsText(3)  # handling of empty grid cells
 
@@ -59,9 +64,8 @@ try:
         workspace_gdb                               # validate for the target geodatabase
     )
 
-    stat_zone_field_ID = "StatZoneID"
     intersect_fc = f"memory\\{prefix}_Int"
-    dissolved_fc = f"{workspace_gdb}\\{prefix}_Dis"
+    dissolved_fc = f"memory\\{prefix}_Dis"
 
     # ----------------------------------------------------------------------
     # VALIDATE DATA FORMATS (BLOCK SHAPEFILES)
@@ -150,115 +154,148 @@ try:
         raise Exception("Field name conflict – remove existing fields and try again.")
 
     # ----------------------------------------------------------------------
-    # 1. CREATE TEMPORARY STATISTICAL ZONE FIELD
-    # ----------------------------------------------------------------------
-    if stat_zone_field_ID in [f.name for f in arcpy.ListFields(grid_fl)]:
-        arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-    arcpy.management.AddField(grid_fl, stat_zone_field_ID, "LONG")
-    arcpy.management.CalculateField(grid_fl, stat_zone_field_ID, f"!{grid_id_field}!", "PYTHON3")
-
-    # ----------------------------------------------------------------------
-    # 2. INTERSECT LINES WITH GRID
+    # 1. INTERSECT LINES WITH GRID
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Intersecting landscape lines with the analytical grid...")
-    arcpy.analysis.Intersect([landscape_fl, grid_fl], intersect_fc, "ALL")
+    arcpy.analysis.PairwiseIntersect([landscape_fl, grid_fl], intersect_fc, "ONLY_FID")
 
-    # ----------------------------------------------------------------------
-    # 3. DISSOLVE LINES BY ZONE
-    # ----------------------------------------------------------------------
-    arcpy.management.Dissolve(intersect_fc, dissolved_fc, stat_zone_field_ID)
+    # FID_<grid> (the field of the second input) carries the grid ObjectID
+    grid_fid_field = [
+        f.name for f in arcpy.ListFields(intersect_fc) if f.name.upper().startswith("FID_")
+    ][-1]
 
     # ----------------------------------------------------------------------
-    # 4. CREATE ATTRIBUTE FIELDS (RAW + STANDARDIZED)
+    # 2. DISSOLVE LINES BY GRID CELL
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Creating Lines_Length and Lines_Length_MIN_MAX fields...")
-
-    arcpy.management.AddField(dissolved_fc, "Lines_Length", "DOUBLE")
-    arcpy.management.CalculateField(dissolved_fc, "Lines_Length", "!Shape_Length!", "PYTHON3")
-
-    arcpy.management.AddField(dissolved_fc, "Lines_Length_MIN_MAX", "DOUBLE")
+    arcpy.analysis.PairwiseDissolve(intersect_fc, dissolved_fc, grid_fid_field)
 
     # ----------------------------------------------------------------------
-    # 5. MIN–MAX STANDARDIZATION
+    # 3. MIN–MAX RANGE OF THE LINE LENGTHS PER GRID CELL
     # ----------------------------------------------------------------------
-    lines_values = [row[0] for row in arcpy.da.SearchCursor(dissolved_fc, ["Lines_Length"]) if row[0] is not None]
+    lines_values = arcpy.da.TableToNumPyArray(dissolved_fc, ["SHAPE@LENGTH"], skip_nulls=True)["SHAPE@LENGTH"]
 
-    if not lines_values:
+    if lines_values.size == 0:
         min_lines = 0
         max_lines = 0
         arcpy.AddWarning("No valid Lines_Length values found. MIN/MAX set to 0.")
     else:
-        min_lines = 0 if use_zero_for_null else min(lines_values)
-        max_lines = max(lines_values)
+        min_lines = 0 if use_zero_for_null else float(np.min(lines_values))
+        max_lines = float(np.max(lines_values))
         arcpy.AddMessage(f"Using MIN={min_lines} and MAX={max_lines} for standardization.")
 
-    with arcpy.da.UpdateCursor(dissolved_fc, ["Lines_Length", "Lines_Length_MIN_MAX"]) as cursor:
-        for row in cursor:
-            val = row[0]
-            if val is None:
-                row[0] = 0 if use_zero_for_null else None
-                row[1] = 0 if use_zero_for_null else None
-            else:
-                if max_lines == min_lines:
+    # ----------------------------------------------------------------------
+    # 4. CREATE ATTRIBUTE FIELDS AND MIN–MAX STANDARDIZATION
+    #    Where both fields are written by this script they are created with
+    #    a single AddFields call; StandardizeField creates its own output field
+    # ----------------------------------------------------------------------
+    arcpy.AddMessage("Creating Lines_Length field...")
+
+    if max_lines == min_lines:
+        # Degenerate case – no variability, all standardized values are 0
+        arcpy.management.AddFields(
+            dissolved_fc,
+            [["Lines_Length", "DOUBLE"], ["Lines_Length_MIN_MAX", "DOUBLE"]]
+        )
+        arcpy.management.CalculateField(dissolved_fc, "Lines_Length", "!shape.length!", "PYTHON3")
+        arcpy.management.CalculateField(dissolved_fc, "Lines_Length_MIN_MAX", "0", "PYTHON3")
+
+    elif use_zero_for_null:
+        # Fixed MIN = 0 cannot be expressed with StandardizeField
+        arcpy.management.AddFields(
+            dissolved_fc,
+            [["Lines_Length", "DOUBLE"], ["Lines_Length_MIN_MAX", "DOUBLE"]]
+        )
+        inv_denom = 1.0 / max_lines
+
+        with arcpy.da.UpdateCursor(
+            dissolved_fc, ["SHAPE@LENGTH", "Lines_Length", "Lines_Length_MIN_MAX"]
+        ) as cursor:
+            for row in cursor:
+                val = row[0]
+                if val is None:
                     row[1] = 0
+                    row[2] = 0
                 else:
-                    row[1] = val / max_lines if use_zero_for_null else (val - min_lines) / (max_lines - min_lines)
-            cursor.updateRow(row)
+                    row[1] = val
+                    row[2] = val * inv_denom
+                cursor.updateRow(row)
+
+    else:
+        # Classical Min–Max of observed values (creates Lines_Length_MIN_MAX)
+        arcpy.management.AddField(dissolved_fc, "Lines_Length", "DOUBLE")
+        arcpy.management.CalculateField(dissolved_fc, "Lines_Length", "!shape.length!", "PYTHON3")
+        arcpy.management.StandardizeField(dissolved_fc, "Lines_Length", "MIN-MAX", 0, 1)
 
     arcpy.AddMessage("Min–Max standardization completed successfully.")
 
     # ----------------------------------------------------------------------
-    # 6. REMOVE OLD JOIN FIELDS FROM GRID
+    # 5. REMOVE OLD JOIN FIELDS FROM GRID
     # ----------------------------------------------------------------------
     for old_field in ["LINES_LENGTH", "LINES_LENGTH_MIN_MAX"]:
         if old_field in [f.name.upper() for f in arcpy.ListFields(grid_fl)]:
             arcpy.management.DeleteField(grid_fl, old_field)
 
     # ----------------------------------------------------------------------
-    # 7. JOIN RESULTS BACK TO GRID
+    # 6. JOIN RESULTS BACK TO GRID
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Joining results back to the analytical grid...")
     arcpy.management.JoinField(
         grid_fl,
-        stat_zone_field_ID,
+        arcpy.Describe(grid_fl).OIDFieldName,
         dissolved_fc,
-        stat_zone_field_ID,
+        grid_fid_field,
         ["Lines_Length", "Lines_Length_MIN_MAX"]
     )
 
     # ----------------------------------------------------------------------
-    # 8. REPLACE NULLS WITH 0 IN GRID (OPTIONAL)
+    # 7. REPLACE NULLS WITH 0 IN GRID (OPTIONAL)
     # ----------------------------------------------------------------------
     if use_zero_for_null:
         arcpy.AddMessage("Replacing NULL values with 0 in the analytical grid fields...")
-        with arcpy.da.UpdateCursor(grid_fl, ["Lines_Length", "Lines_Length_MIN_MAX"]) as cursor:
-            for row in cursor:
-                if row[0] is None:
-                    row[0] = 0
-                if row[1] is None:
-                    row[1] = 0
-                cursor.updateRow(row)
-
-    # ----------------------------------------------------------------------
-    # 9. RENAME JOINED FIELDS
+        # The edit session must be opened on the geodatabase itself, not on a
+        # feature dataset that may contain the grid
+        grid_workspace = arcpy.Describe(grid_fl).path
+        while arcpy.Describe(grid_workspace).dataType != "Workspace":
+            grid_workspace = arcpy.Describe(grid_workspace).path
+
+        # Only rows with NULLs are visited, within a single edit operation
+        # (no undo stack, no multiuser mode)
+        editor = arcpy.da.Editor(grid_workspace)
+        editor.startEditing(False, False)
+        editor.startOperation()
+        try:
+            with arcpy.da.UpdateCursor(
+                grid_fl, ["Lines_Length", "Lines_Length_MIN_MAX"],
+                "Lines_Length IS NULL OR Lines_Length_MIN_MAX IS NULL"
+            ) as cursor:
+                for row in cursor:
+                    if row[0] is None:
+                        row[0] = 0
+                    if row[1] is None:
+                        row[1] = 0
+                    cursor.updateRow(row)
+            editor.stopOperation()
+            editor.stopEditing(True)
+        except Exception:
+            editor.abortOperation()
+            editor.stopEditing(False)
+            raise
+
+    # ----------------------------------------------------------------------
+    # 8. RENAME JOINED FIELDS
     # ----------------------------------------------------------------------
     arcpy.management.AlterField(grid_fl, "Lines_Length", output_index_name, output_index_alias)
     arcpy.management.AlterField(grid_fl, "Lines_Length_MIN_MAX", std_output_index_name, std_output_index_alias)
 
     # ----------------------------------------------------------------------
-    # 10. CLEANUP
+    # 9. CLEANUP
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Removing temporary zone field...")
-    arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-
     arcpy.AddMessage("Cleaning intermediate datasets...")
     for fc in (intersect_fc, dissolved_fc):
         if arcpy.Exists(fc):
             arcpy.management.Delete(fc)
 
     arcpy.ClearWorkspaceCache_management()
-    if workspace_gdb.endswith(".gdb"):
-        arcpy.management.Compact(workspace_gdb)
 
     arcpy.AddMessage("L_Tl calculation completed successfully.")
 
@@ -4,13 +4,31 @@
 # 2026-01-26
 
 import arcpy
-import math
+import numpy as np
 
 # Allow overwrite
 arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
+
+# ----------------------------------------------------------------------
+# Helper function definition: unit_entropy
+# ----------------------------------------------------------------------
+# Vectorized H_i = -(q_i * ln(q_i)) over a NumPy array of proportions.
+# Cells with q_i = 0 contribute 0; ln() is evaluated only where q_i > 0,
+# writing into preallocated buffers to avoid temporary arrays.
+# Computed in float32: H_i is only summed and then scaled to [0, 1].
+def unit_entropy(q):
+    q = np.asarray(q, dtype=np.float32)
+    h = np.zeros_like(q)
+    positive = q > 0
+    np.log(q, out=h, where=positive)
+    np.multiply(h, q, out=h)
+    np.subtract(0.0, h, out=h)
+    return h
 
 try:
     # ----------------------------------------------------------------------
@@ -19,25 +37,24 @@ try:
     landscape_fl = arcpy.GetParameterAsText(0)           # point feature layer
     landscape_attr = arcpy.GetParameterAsText(1)         # geosites category field
     grid_fl = arcpy.GetParameterAsText(2)                # grid layer
+    # grid_id_field is read to keep the toolbox parameter order; results are
+    # joined on the grid ObjectID (OID@), so the field itself is not used
     grid_id_field = arcpy.GetParameterAsText(3)          # OBJECTID of the grid
 
     # ----------------------------------------------------------------------
     # WORKSPACE, PREFIX, FIELDS AND INTERMEDIATE DATASETS
     # ----------------------------------------------------------------------
-    workspace_gdb = arcpy.Describe(landscape_fl).path
     #prefix = arcpy.Describe(landscape_fl).baseName[:3].upper()
     desc_land = arcpy.Describe(landscape_fl)        # get the layer's metadata
+    workspace_gdb = desc_land.path
     base_name = desc_land.name                      # FC name without the path
     prefix = arcpy.ValidateTableName(
         base_name[:3].upper(),                      # first 3 letters in uppercase
         workspace_gdb                               # validate for the target geodatabase
     )
 
-    stat_zone_field_ID = "StatZoneID"
-    intersect_fc = f"{workspace_gdb}\\{prefix}_Hu_Int"
-    tabulate_intersection_table = f"{workspace_gdb}\\{prefix}_Hu_Ti_Tbl"
-    Hu_table = f"{workspace_gdb}\\{prefix}_Hu_Tbl"
-    stats_table = f"memory\\{prefix}_stats_temp"
+    zone_field_ID = "GRID_OID"
+    point_zone_fc = f"memory\\{prefix}_Hu_PtZ"
 
     # ----------------------------------------------------------------------
     # VALIDATE DATA FORMATS (BLOCK SHAPEFILES)
@@ -70,8 +87,10 @@ try:
         raise arcpy.ExecuteError
 
     # Get updated extents
+    # (the grid Describe is kept for its spatial index flag and OID field name)
     ext_land = arcpy.Describe(landscape_fl).extent
-    ext_grid = arcpy.Describe(grid_fl).extent
+    desc_grid = arcpy.Describe(grid_fl)
+    ext_grid = desc_grid.extent
 
     # Check spatial intersection of extents
     # Two extents intersect if they are NOT disjoint
@@ -103,34 +122,17 @@ try:
     except:
         pass
 
-    # ----------------------------------------------------------------------
-    # CHECK IF INTERMEDIATE DATASETS ALREADY EXIST IN GDB
-    # ----------------------------------------------------------------------
-    intermediate_items = [
-        intersect_fc,
-        tabulate_intersection_table,
-        Hu_table
-    ]
-    arcpy.AddMessage("Checking for leftover intermediate datasets...")
-
-    for item in intermediate_items:
-        if arcpy.Exists(item):
-            try:
-                arcpy.management.Delete(item)
-                arcpy.AddMessage(f"Removed leftover dataset: {item}")
-            except:
-                arcpy.AddWarning(f"Could not remove leftover dataset: {item}")
-
     # ----------------------------------------------------------------------
     # CHECK IF OUTPUT FIELDS ALREADY EXIST IN GRID TABLE
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Checking if the output fields already exist...")
-    existing_fields = [f.name.upper() for f in arcpy.ListFields(grid_fl)]
+    # Grid schema read once and reused by the field checks below
+    grid_fields_upper = {f.name.upper() for f in arcpy.ListFields(grid_fl)}
 
     field_raw = output_index_name.upper()
     field_std = std_output_index_name.upper()
 
-    if field_raw in existing_fields or field_std in existing_fields:
+    if field_raw in grid_fields_upper or field_std in grid_fields_upper:
         arcpy.AddError(
             f"Fields '{output_index_name.upper()}' already exist "
             f"in the analytical grid attribute table.\n"
@@ -139,136 +141,123 @@ try:
         raise Exception("Field name conflict – remove existing fields and try again.")
 
     # ----------------------------------------------------------------------
-    # 1. CREATE TEMPORARY STATISTICAL ZONE FIELD ID TO AVOID OBJECTID_1 CONFLICTS
+    # 1. SPATIAL JOIN – assign each point the ObjectID of the grid cell it falls in
+    # JOIN_ONE_TO_MANY keeps a point lying on a shared cell border in every touching cell
+    # and writes the grid ObjectID to JOIN_FID, so no temporary zone field is needed.
+    # Only the category field is carried to the output.
     # ----------------------------------------------------------------------
-    arcpy.AddMessage(f"Creating temporary zone field: {stat_zone_field_ID}...")
-
-    # Remove if exist in grid_fl
-    if stat_zone_field_ID in [f.name for f in arcpy.ListFields(grid_fl)]:
-        arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
+    # The join probes the grid for every point; make sure it has a spatial index
+    if not desc_grid.hasSpatialIndex:
+        arcpy.AddMessage("Adding spatial index to the analytical grid...")
+        arcpy.management.AddSpatialIndex(grid_fl)
 
-    arcpy.management.AddField(grid_fl, stat_zone_field_ID, "LONG")
-    arcpy.management.CalculateField(grid_fl, stat_zone_field_ID, f"!{grid_id_field}!", "PYTHON3")
-
-    # ----------------------------------------------------------------------
-    # 2. SPATIAL JOIN
-    # ----------------------------------------------------------------------
     arcpy.AddMessage("SPATIALLY JOINING landscape points with the analytical grid...")
-    arcpy.analysis.SpatialJoin(grid_fl, landscape_fl, intersect_fc, "JOIN_ONE_TO_ONE","KEEP_ALL", "", "INTERSECT")
-
-    arcpy.management.AlterField(intersect_fc, "Join_Count", "Ne")
-
-    # ----------------------------------------------------------------------
-    # 3. TABULATE INTERSECTION
-    # Funkcja tworzy tabelę złożoną z kolumn: 1) ID komórki grida, 2) wartość kategorii, 3) liczby punktów tej kategorii (PNT_COUNT)
-    # ----------------------------------------------------------------------
-    #arcpy.analysis.TabulateIntersection(grid_fl, grid_id_field, landscape_fl, tabulate_intersection_table, landscape_attr)
-    arcpy.analysis.TabulateIntersection(grid_fl, stat_zone_field_ID, landscape_fl, tabulate_intersection_table, landscape_attr)
+    field_mappings = arcpy.FieldMappings()
+    field_map = arcpy.FieldMap()
+    field_map.addInputField(landscape_fl, landscape_attr)
+    field_mappings.addFieldMap(field_map)
+
+    arcpy.analysis.SpatialJoin(
+        landscape_fl, grid_fl, point_zone_fc,
+        "JOIN_ONE_TO_MANY", "KEEP_COMMON", field_mappings, "INTERSECT"
+    )
 
     # ----------------------------------------------------------------------
-    # 4. q_i = PNT_COUNT / Ne
-    # ----------------------------------------------------------------------
-    # Add new attribute Ne to the tabulate_intersection_table
-    #arcpy.management.JoinField(tabulate_intersection_table, f"{grid_id_field}_1", intersect_fc, grid_id_field,["Ne"])
-    arcpy.management.JoinField(tabulate_intersection_table, stat_zone_field_ID, intersect_fc, stat_zone_field_ID, ["Ne"])
+    # 2. CALCULATE UNIT ENTROPY H_i = -(q_i * ln(q_i)), q_i = PNT_COUNT / Ne
+    # PNT_COUNT – number of points of a category within a grid cell
+    # Ne        – number of points within a grid cell (sum of its PNT_COUNT)
+    # ----------------------------------------------------------------------
+    arcpy.AddMessage("Calculating unit entropy in memory...")
+    category_codes = {}
+    with arcpy.da.SearchCursor(point_zone_fc, ["JOIN_FID", landscape_attr]) as cursor:
+        zone_category = np.array(
+            [
+                (zone, category_codes.setdefault(category, len(category_codes)))
+                for zone, category in cursor
+                if zone is not None
+            ],
+            dtype=np.int64
+        ).reshape(-1, 2)
+
+    # Distinct (zone, category) pairs and their point counts. Each pair is packed
+    # into one int64 key so a 1-D sort replaces the slower row-wise unique.
+    n_categories = max(len(category_codes), 1)
+    pair_keys, pnt_count = np.unique(
+        zone_category[:, 0] * n_categories + zone_category[:, 1], return_counts=True
+    )
 
-    # Add new attribute q_i to the tabulate_intersection_table
-    arcpy.management.AddField(tabulate_intersection_table, "q_i", "DOUBLE")
+    # Keys are sorted, so the pairs of one zone form a contiguous run
+    pair_zone = pair_keys // n_categories
+    zone_start = np.ones(pair_zone.size, dtype=bool)
+    zone_start[1:] = pair_zone[1:] != pair_zone[:-1]
+    zone_ids = pair_zone[zone_start]
+    zone_index = np.cumsum(zone_start) - 1
+    ne = np.bincount(zone_index, weights=pnt_count).astype(np.float32)[zone_index]
 
-    # CALCULATE q_i
-    arcpy.management.CalculateField(tabulate_intersection_table,"q_i","(!PNT_COUNT! / !Ne!) if !Ne! > 0 else 0","PYTHON3")
+    H_i = unit_entropy(pnt_count.astype(np.float32) / ne)
 
     # ----------------------------------------------------------------------
-    # 5. CALCULATE UNIT ENTROPY H_i = -(q_i * ln(q_i))
-    # ----------------------------------------------------------------------
-    arcpy.management.AddField(tabulate_intersection_table, "H_i", "DOUBLE")
-    arcpy.management.CalculateField(tabulate_intersection_table,"H_i","-(!q_i! * math.log(!q_i!)) if !q_i! > 0 else 0","PYTHON3")
-
+    # 3. SUMMARIZE ALL H_i PER GRID CELL (Hu = SUM_H_i)
     # ----------------------------------------------------------------------
-    # 6. SUMMARIZE ALL H_i -- use the grid ID field name present in the tabulate table (usually grid_id + "_1")
-    # ----------------------------------------------------------------------
-    #arcpy.analysis.Statistics(tabulate_intersection_table, Hu_table,[["H_i", "SUM"]], f"{grid_id_field}_1")
-    arcpy.analysis.Statistics(tabulate_intersection_table, Hu_table, [["H_i", "SUM"]], stat_zone_field_ID)
+    hu_arr = np.empty(
+        zone_ids.size,
+        dtype=[(zone_field_ID, "<i4"), ("SUM_H_i", "<f8"), ("SUM_H_i_MIN_MAX", "<f8")]
+    )
+    hu_arr[zone_field_ID] = zone_ids
+    hu_arr["SUM_H_i"] = np.bincount(zone_index, weights=H_i, minlength=zone_ids.size)
 
     # ----------------------------------------------------------------------
-    # 7. SAFE MIN–MAX STANDARDIZATION FOR Hu (memory version)
+    # 4. SAFE MIN–MAX STANDARDIZATION FOR Hu (memory version)
     # If MIN(Hu) == MAX(Hu), assign 0 to all rows
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Standardizing P_Hu (Min-Max)...")
 
-    # 7.1. Calculate statistics (min and max of SUM_H_i) using memory table
-    arcpy.analysis.Statistics(Hu_table, stats_table, [["SUM_H_i", "MIN"], ["SUM_H_i", "MAX"]])
-
-    # 7.2. Read min/max values
-    with arcpy.da.SearchCursor(stats_table, ["MIN_SUM_H_i", "MAX_SUM_H_i"]) as cursor:
-        for row in cursor:
-            min_SUM_H_i = float(row[0])
-            max_SUM_H_i = float(row[1])
-
-    # 7.3. Delete temporary in_memory table
-    arcpy.management.Delete(stats_table)
+    # 4.1. MIN and MAX of SUM_H_i, taken directly from the in-memory Hu array
+    if hu_arr.size:
+        min_SUM_H_i = float(hu_arr["SUM_H_i"].min())
+        max_SUM_H_i = float(hu_arr["SUM_H_i"].max())
+    else:
+        min_SUM_H_i = max_SUM_H_i = 0.0
 
-    # 7.4. Case 1 — all values identical → assign 0 to all records
     if min_SUM_H_i == max_SUM_H_i:
         arcpy.AddMessage(
             "All Hu values are identical (MIN = MAX). "
             "Skipping Min–Max standardization. Assigning 0 to SUM_H_i_MIN_MAX."
         )
 
-        # Add new field for standardized values
-        if "SUM_H_i_MIN_MAX" not in [f.name for f in arcpy.ListFields(Hu_table)]:
-            arcpy.management.AddField(Hu_table, "SUM_H_i_MIN_MAX", "DOUBLE")
-
-        # Set all SUM_H_i_MIN_MAX values to 0
-        arcpy.management.CalculateField(Hu_table, "SUM_H_i_MIN_MAX", 0, "PYTHON3")
-
-    # 7.5. Case 2 — normal standardization
-    else:
-        arcpy.AddMessage("Performing Min–Max standardization of Hu...")
-        arcpy.management.StandardizeField(Hu_table, "SUM_H_i", "MIN-MAX", 0, 1)
-
-    # ----------------------------------------------------------------------
-    # 8. ENSURE OLD JOIN FIELDS ARE REMOVED FROM THE GRID
-    # ----------------------------------------------------------------------
-    fields_to_check = ["SUM_H_i", "SUM_H_i_MIN_MAX"]
-    existing_fields = [f.name.upper() for f in arcpy.ListFields(grid_fl)]
-
-    # Checking whether any fields need to be removed at all
-    fields_to_remove = [f for f in fields_to_check if f in existing_fields]
-
-    if fields_to_remove:
-        arcpy.AddMessage("Removing old join field from the grid...")
-        for old_field in fields_to_remove:
-            arcpy.management.DeleteField(grid_fl, old_field)
+    # 4.2. Standardize in NumPy; the zero range case yields 0 for all records
+    range_SUM_H_i = max_SUM_H_i - min_SUM_H_i
+    hu_arr["SUM_H_i_MIN_MAX"] = 0.0
+    np.divide(
+        hu_arr["SUM_H_i"] - min_SUM_H_i, range_SUM_H_i,
+        out=hu_arr["SUM_H_i_MIN_MAX"], where=range_SUM_H_i != 0
+    )
 
     # ----------------------------------------------------------------------
-    # 9. JOIN RESULTS BACK TO THE GRID LAYER
+    # 5. JOIN RESULTS BACK TO THE GRID LAYER
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Joining results back to the analytical grid...")
-    #arcpy.management.JoinField(grid_fl, grid_id_field, Hu_table, f"{grid_id_field}_1",["SUM_H_i", "SUM_H_i_MIN_MAX"])
-    arcpy.management.JoinField(grid_fl, stat_zone_field_ID, Hu_table, stat_zone_field_ID, ["SUM_H_i", "SUM_H_i_MIN_MAX"])
+    # Output names are unique (checked above), so the Hu columns are renamed in
+    # the array and ExtendTable appends them in place under their final names,
+    # matching the grid ObjectID (cells without points stay NULL)
+    hu_arr.dtype.names = (zone_field_ID, output_index_name, std_output_index_name)
+    arcpy.da.ExtendTable(grid_fl, desc_grid.OIDFieldName, hu_arr, zone_field_ID)
 
     # ----------------------------------------------------------------------
-    # 10. RENAME JOINED FIELDS
+    # 6. SET ALIASES OF THE JOINED FIELDS
     # ----------------------------------------------------------------------
-    arcpy.management.AlterField(grid_fl,"SUM_H_i", output_index_name, output_index_alias)
-    arcpy.management.AlterField(grid_fl, "SUM_H_i_MIN_MAX",std_output_index_name, std_output_index_alias)
+    arcpy.management.AlterField(grid_fl, output_index_name, new_field_alias=output_index_alias)
+    arcpy.management.AlterField(grid_fl, std_output_index_name, new_field_alias=std_output_index_alias)
     arcpy.AddMessage(f"Unit entropy ({output_index_name}) calculated successfully.")
 
     # ----------------------------------------------------------------------
-    # 11. CLEANUP
+    # 7. CLEANUP
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Removing temporary zone field...")
-    arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-
     arcpy.AddMessage("Cleaning intermediate datasets...")
-    for fc in (intersect_fc, tabulate_intersection_table, Hu_table):
-        if arcpy.Exists(fc):
-            arcpy.management.Delete(fc)
+    if arcpy.Exists(point_zone_fc):
+        arcpy.management.Delete(point_zone_fc)
 
     arcpy.ClearWorkspaceCache_management()
-    if workspace_gdb.endswith(".gdb"):
-        arcpy.management.Compact(workspace_gdb)
     arcpy.AddMessage("P_Hu calculation completed successfully.")
 
 except arcpy.ExecuteError:
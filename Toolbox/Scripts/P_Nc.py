@@ -5,12 +5,15 @@
 # 2026-01-26
 
 import arcpy
+import numpy as np
 
 # Allow overwrite
 arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
 
 try:
     # ----------------------------------------------------------------------
@@ -19,6 +22,8 @@ try:
     landscape_fl = arcpy.GetParameterAsText(0)           # point feature layer
     landscape_attr = arcpy.GetParameterAsText(1)         # geosites category field
     grid_fl = arcpy.GetParameterAsText(2)                # grid layer
+    # grid_id_field is read to keep the toolbox parameter order; results are
+    # joined on the grid ObjectID (OID@), so the field itself is not used
     grid_id_field = arcpy.GetParameterAsText(3)          # OBJECTID of the statistical zones
     null_handling_mode = arcpy.GetParameterAsText(4)     # handling of empty grid cells
 
@@ -51,18 +56,16 @@ try:
     # ----------------------------------------------------------------------
     # WORKSPACE, PREFIX, FIELDS AND INTERMEDIATE DATASETS
     # ----------------------------------------------------------------------
-    workspace_gdb = arcpy.Describe(landscape_fl).path
     #prefix = arcpy.Describe(landscape_fl).baseName[:3].upper()
     desc_land = arcpy.Describe(landscape_fl)        # get the layer's metadata
+    workspace_gdb = desc_land.path
     base_name = desc_land.name                      # FC name without the path
     prefix = arcpy.ValidateTableName(
         base_name[:3].upper(),                      # first 3 letters in uppercase
         workspace_gdb                               # validate for the target geodatabase
     )
 
-    stat_zone_field_ID = "StatZoneID"
-    dissolved_fc = f"{workspace_gdb}\\{prefix}_Dis"
-    nc_table = f"{workspace_gdb}\\{prefix}_Nc"
+    point_zone_fc = f"memory\\{prefix}_Nc_PtZ"
 
     # ----------------------------------------------------------------------
     # VALIDATE DATA FORMATS (BLOCK SHAPEFILES)
@@ -95,8 +98,10 @@ try:
         raise arcpy.ExecuteError
 
     # Get updated extents
+    # (the grid Describe is kept for its spatial index flag and OID field name)
     ext_land = arcpy.Describe(landscape_fl).extent
-    ext_grid = arcpy.Describe(grid_fl).extent
+    desc_grid = arcpy.Describe(grid_fl)
+    ext_grid = desc_grid.extent
 
     # Check spatial intersection of extents
     # Two extents intersect if they are NOT disjoint
@@ -128,29 +133,11 @@ try:
     except:
         pass
 
-    # ----------------------------------------------------------------------
-    # CHECK IF INTERMEDIATE DATASETS ALREADY EXIST IN GDB
-    # ----------------------------------------------------------------------
-    intermediate_items = [
-        dissolved_fc,
-        nc_table
-    ]
-
-    arcpy.AddMessage("Checking for leftover intermediate datasets...")
-
-    for item in intermediate_items:
-        if arcpy.Exists(item):
-            try:
-                arcpy.management.Delete(item)
-                arcpy.AddMessage(f"Removed leftover dataset: {item}")
-            except:
-                arcpy.AddWarning(f"Could not remove leftover dataset: {item}")
-
     # ----------------------------------------------------------------------
     # CHECK IF OUTPUT FIELDS ALREADY EXIST IN GRID TABLE
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Checking if the output fields already exist...")
-    existing_fields = [f.name.upper() for f in arcpy.ListFields(grid_fl)]
+    existing_fields = {f.name.upper() for f in arcpy.ListFields(grid_fl)}
 
     field_raw = output_index_name.upper()
     field_std = std_output_index_name.upper()
@@ -164,182 +151,134 @@ try:
         raise Exception("Field name conflict – remove existing fields and try again.")
 
     # ----------------------------------------------------------------------
-    # 1. CREATE TEMPORARY STATISTICAL ZONE FIELD ID TO AVOID OBJECTID_1 CONFLICTS
-    # ----------------------------------------------------------------------
-    arcpy.AddMessage(f"Creating temporary zone field: {stat_zone_field_ID}...")
-
-    # Remove if exist in grid_fl
-    if stat_zone_field_ID in [f.name for f in arcpy.ListFields(grid_fl)]:
-        arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-
-    arcpy.management.AddField(grid_fl, stat_zone_field_ID, "LONG")
-    arcpy.management.CalculateField(grid_fl, stat_zone_field_ID, f"!{grid_id_field}!", "PYTHON3")
-
-    # ----------------------------------------------------------------------
-    # 2. Assigning each point feature (geosite) the identifier (OBJECTID)
+    # 1. Assigning each point feature (geosite) the identifier (OBJECTID)
     #    of the grid cell (statistical zone) in which it is located.
-    #    The OBJECTID is assigned to the NEAR_FID attribute of the point feature class
-    # ----------------------------------------------------------------------
-    arcpy.analysis.Near(landscape_fl, grid_fl)
+    #    INTERSECT is a true point-in-polygon test; JOIN_ONE_TO_MANY keeps a point
+    #    lying on a shared cell border in every touching cell and writes the
+    #    OBJECTID to JOIN_FID. The input point layer is left unchanged; only the
+    #    category field is carried over.
+    # ----------------------------------------------------------------------
+    # The join probes the grid for every point; make sure it has a spatial index
+    if not desc_grid.hasSpatialIndex:
+        arcpy.AddMessage("Adding spatial index to the analytical grid...")
+        arcpy.management.AddSpatialIndex(grid_fl)
+
+    arcpy.AddMessage("Assigning grid cells to the landscape points...")
+    field_mappings = arcpy.FieldMappings()
+    field_map = arcpy.FieldMap()
+    field_map.addInputField(landscape_fl, landscape_attr)
+    field_mappings.addFieldMap(field_map)
+
+    arcpy.analysis.SpatialJoin(
+        landscape_fl, grid_fl, point_zone_fc,
+        "JOIN_ONE_TO_MANY", "KEEP_COMMON", field_mappings, "INTERSECT"
+    )
 
     # ----------------------------------------------------------------------
-    # 3. DISSOLVE points by category within each cell of the analytical grid
+    # 2. COUNT distinct point categories within each cell of the analytical grid
+    #    (replaces Dissolve by [category, cell] followed by Frequency by cell)
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Dissolving the landscape points by category...")
-    arcpy.management.Dissolve(landscape_fl, dissolved_fc, [landscape_attr, "NEAR_FID"])
+    arcpy.AddMessage("Counting point categories per grid cell in memory...")
+    # Columnar read of (cell, category); points with a NULL category are read
+    # separately, as NULL counts as one more category (as in Dissolve)
+    points = arcpy.da.TableToNumPyArray(
+        point_zone_fc, ["JOIN_FID", landscape_attr], skip_nulls=True
+    )
+    null_category_where = f"{arcpy.AddFieldDelimiters(point_zone_fc, landscape_attr)} IS NULL"
+    null_category_zones = arcpy.da.TableToNumPyArray(
+        point_zone_fc, ["JOIN_FID"], where_clause=null_category_where
+    )["JOIN_FID"]
+
+    # Integer category codes; the NULL category gets the next free code
+    categories, category_codes = np.unique(points[landscape_attr], return_inverse=True)
+    zone_category = np.empty((points.size + null_category_zones.size, 2), dtype=np.int64)
+    zone_category[:points.size, 0] = points["JOIN_FID"]
+    zone_category[:points.size, 1] = category_codes.ravel()
+    zone_category[points.size:, 0] = null_category_zones
+    zone_category[points.size:, 1] = categories.size
+
+    # Each distinct (cell, category) pair is packed into one int64 key;
+    # the number of distinct keys per cell is Nc
+    n_categories = categories.size + 1
+    pair_keys = np.unique(zone_category[:, 0] * n_categories + zone_category[:, 1])
+    zone_ids, nc_values = np.unique(pair_keys // n_categories, return_counts=True)
+
+    # ----------------------------------------------------------------------
+    # 3. COMPLETE the Nc values with grid cells that contain no points
+    #    Replace NULL with 0 → the missing cells are added with Nc = 0
+    #    Keep NULL          → the missing cells are left out and stay NULL after the join
+    # ----------------------------------------------------------------------
+    # nc_values keeps the observed Nc values (cells with points) only; they are
+    # the basis for MIN and MAX below. Missing cells are appended to zone_ids
+    if use_zero_for_null:
+        grid_oids = arcpy.da.TableToNumPyArray(grid_fl, ["OID@"])["OID@"]
+        missing_oids = np.setdiff1d(grid_oids, zone_ids, assume_unique=True)
 
-    # ----------------------------------------------------------------------
-    # 4. CALCULATE the frequency of point category groups within each cell of the analytical grid
-    # ----------------------------------------------------------------------
-    arcpy.analysis.Frequency(dissolved_fc, nc_table, ["NEAR_FID"])
+        zone_ids = np.concatenate((zone_ids, missing_oids))
+        arcpy.AddMessage(f"Added {missing_oids.size} missing cells with Nc = 0")
 
     # ----------------------------------------------------------------------
-    # 4.1. Completing the nc_table with missing grid cells assigned FREQUENCY = 0
-    # ----------------------------------------------------------------------
-    arcpy.AddMessage("Missing cells added to nc_table FREQUENCY=0...")
-
-    # Retrieval of all analytical grid cell identifiers (StatZoneID)
-    all_near_fid = []
-    with arcpy.da.SearchCursor(grid_fl, [stat_zone_field_ID]) as cursor:
-        for row in cursor:
-            all_near_fid.append(row[0])
-
-    # Retrieval of all NEAR_FID grid cell identifiers present in nc_table (only cells containing geosites)
-    existing_near_fid = []
-    with arcpy.da.SearchCursor(nc_table, ["NEAR_FID"]) as cursor:
-        for row in cursor:
-            existing_near_fid.append(row[0])
-
-    # Rows present in the analytical grid table but not present in nc_table
-    missing_near_fid = set(all_near_fid) - set(existing_near_fid)
-
-    # Adding missing rows to nc_table according to NULL handling mode
-    if missing_near_fid:
-        with arcpy.da.InsertCursor(nc_table, ["NEAR_FID", "FREQUENCY"]) as cursor:
-            for fid in missing_near_fid:
-                if use_zero_for_null:
-                    cursor.insertRow([fid, 0])     # replace missing with 0
-                else:
-                    cursor.insertRow([fid, None])  # keep as NULL
-
-    arcpy.AddMessage(f"Added {len(missing_near_fid)} missing records with FREQUENCY = 0")
-
-    # ----------------------------------------------------------------------
-    # 5. SAFE MIN–MAX STANDARDIZATION FOR Nc
+    # 4. SAFE MIN–MAX STANDARDIZATION FOR Nc
     # Statistical zones without geosites → Std_P_Nc = 0
     # MIN for standardization is fixed at 0 (no geosites in the cell)
     # MAX for standardization is taken from the actual observed values
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Standardizing P_Nc (Min-Max) with proper handling of empty cells...")
 
-    # 5.1. Handle NULL FREQUENCY values according to user choice
-    with arcpy.da.UpdateCursor(nc_table, ["FREQUENCY"]) as cursor:
-        for row in cursor:
-            if row[0] is None:
-                if use_zero_for_null:
-                    row[0] = 0  # user-selected: NULL → 0
-                    cursor.updateRow(row)
-                else:
-                    pass  # user-selected: keep NULL
-
-    # 5.2. Calculate MIN and MAX for standardization according to user choice
-    frequencies = []
-
-    with arcpy.da.SearchCursor(nc_table, ["FREQUENCY"]) as cursor:
-        for row in cursor:
-            if row[0] is not None:
-                frequencies.append(row[0])
-
-    if not frequencies:
-        min_FREQUENCY = 0
-        max_FREQUENCY = 0
+    # 4.1. Calculate MIN and MAX for standardization according to user choice
+    if nc_values.size == 0:
+        min_nc = 0
+        max_nc = 0
     else:
         if use_zero_for_null:
-            min_FREQUENCY = 0
-            max_FREQUENCY = max(frequencies)
+            min_nc = 0
+            max_nc = int(nc_values.max())
         else:
-            min_FREQUENCY = min(frequencies)
-            max_FREQUENCY = max(frequencies)
-
-    # 5.3. Add field for standardized values (if it does not exist yet)
-    if "FREQUENCY_MIN_MAX" not in [f.name for f in arcpy.ListFields(nc_table)]:
-        arcpy.management.AddField(nc_table, "FREQUENCY_MIN_MAX", "DOUBLE")
-
-    # 5.4. Apply Min–Max standardization according to selected mode
-    with arcpy.da.UpdateCursor(nc_table, ["FREQUENCY", "FREQUENCY_MIN_MAX"]) as cursor:
+            min_nc = int(nc_values.min())
+            max_nc = int(nc_values.max())
 
-        if max_FREQUENCY == min_FREQUENCY:
-            # Degenerate case – no variability
-            for row in cursor:
-                row[1] = 0
-                cursor.updateRow(row)
-
-        else:
-            for row in cursor:
-                value = row[0]
-
-                if value is None:
-                    # Preserve NULLs if user chose so
-                    if use_zero_for_null:
-                        value = 0
-                    else:
-                        row[1] = None
-                        cursor.updateRow(row)
-                        continue
-
-                if use_zero_for_null:
-                    # MIN fixed at 0
-                    row[1] = value / max_FREQUENCY
-                else:
-                    # Classical Min–Max
-                    row[1] = (value - min_FREQUENCY) / (max_FREQUENCY - min_FREQUENCY)
-
-                cursor.updateRow(row)
+    # 4.2. Build the join array with the final output field names
+    nc_join = np.empty(
+        zone_ids.size,
+        dtype=[("GRID_OID", "<i4"), (output_index_name, "<i4"), (std_output_index_name, "<f8")]
+    )
+    nc_join["GRID_OID"] = zone_ids
+    # Cells appended in step 3 follow the observed ones and get Nc = 0
+    nc_join[output_index_name] = 0
+    nc_join[output_index_name][:nc_values.size] = nc_values
+
+    # 4.3. Apply Min–Max standardization according to selected mode
+    # (with use_zero_for_null MIN is fixed at 0, so both modes share one formula;
+    # the degenerate case MIN = MAX – no variability – yields 0 for all cells)
+    range_nc = max_nc - min_nc
+    nc_join[std_output_index_name] = 0.0
+    np.divide(
+        nc_join[output_index_name] - min_nc, range_nc,
+        out=nc_join[std_output_index_name], where=range_nc != 0
+    )
 
     arcpy.AddMessage("Standardization completed.")
 
     # ----------------------------------------------------------------------
-    # 6. ENSURE OLD JOIN FIELDS ARE REMOVED FROM THE GRID
-    # ----------------------------------------------------------------------
-    fields_to_check = ["FREQUENCY", "FREQUENCY_MIN_MAX"]
-    existing_fields = [f.name.upper() for f in arcpy.ListFields(grid_fl)]
-
-    # Checking whether any fields need to be removed at all
-    fields_to_remove = [f for f in fields_to_check if f in existing_fields]
-
-    if fields_to_remove:
-        arcpy.AddMessage("Removing old join fields from the grid...")
-        for old_field in fields_to_remove:
-            arcpy.management.DeleteField(grid_fl, old_field)
-
-    # ----------------------------------------------------------------------
-    # 7. JOIN RESULTS BACK TO THE GRID LAYER
+    # 5. JOIN RESULTS BACK TO THE GRID LAYER
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Joining results back to the analytical grid...")
-    arcpy.management.JoinField(grid_fl, stat_zone_field_ID, nc_table, "NEAR_FID",["FREQUENCY", "FREQUENCY_MIN_MAX"])
+    # ExtendTable appends both columns in place under their final names
+    # (checked for conflicts above)
+    arcpy.da.ExtendTable(grid_fl, desc_grid.OIDFieldName, nc_join, "GRID_OID")
 
     # ----------------------------------------------------------------------
-    # 8. RENAME JOINED FIELDS
+    # 6. SET ALIASES OF THE JOINED FIELDS
     # ----------------------------------------------------------------------
-    arcpy.management.AlterField(grid_fl, "FREQUENCY", output_index_name, output_index_alias)
-    arcpy.management.AlterField(grid_fl, "FREQUENCY_MIN_MAX", std_output_index_name, std_output_index_alias)
+    arcpy.management.AlterField(grid_fl, output_index_name, new_field_alias=output_index_alias)
+    arcpy.management.AlterField(grid_fl, std_output_index_name, new_field_alias=std_output_index_alias)
 
     # ----------------------------------------------------------------------
-    # 9. CLEANUP
+    # 7. CLEANUP
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Removing temporary zone field...")
-    arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-
     arcpy.AddMessage("Cleaning intermediate datasets...")
-    arcpy.management.DeleteField(landscape_fl, ["NEAR_FID", "NEAR_DIST"])
-
-    for fl in (dissolved_fc, nc_table):
-        if arcpy.Exists(fl):
-            arcpy.management.Delete(fl)
-
-    arcpy.ClearWorkspaceCache_management()
-    if workspace_gdb.endswith(".gdb"):
-        arcpy.management.Compact(workspace_gdb)
+    if arcpy.Exists(point_zone_fc):
+        arcpy.management.Delete(point_zone_fc)
 
     arcpy.AddMessage("P_Nc calculation completed successfully.")
 
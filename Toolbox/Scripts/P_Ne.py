@@ -5,12 +5,69 @@
 # 2026-01-26
 
 import arcpy
+import numpy as np
 
 # Allow overwrite
 arcpy.env.overwriteOutput = True
 # Prevent Z-coordinate and M-coordinate inheritance in feature classes
 arcpy.env.outputZFlag = "Disabled"
 arcpy.env.outputMFlag = "Disabled"
+# Use all available cores in tools that support parallel processing
+arcpy.env.parallelProcessingFactor = "100%"
+
+# ----------------------------------------------------------------------
+# Helper function definition: regular_grid_lattice
+# ----------------------------------------------------------------------
+# Returns (x0, y0, dx, dy, lattice) when fc is a grid of equal, axis-aligned
+# rectangular cells, otherwise None. lattice is a (rows, cols) array holding
+# the cell ObjectIDs (-1 where there is no cell).
+# The cell size comes from the envelope of one cell; every centroid is then
+# snapped to the lattice with a tolerance of 0.1% of the cell size, because
+# centroids and areas computed from large or fractional coordinates carry
+# rounding noise. The lattice origin is averaged over all cells.
+def regular_grid_lattice(fc):
+    dx = dy = None
+    with arcpy.da.SearchCursor(fc, ["SHAPE@"]) as cursor:
+        for (shape,) in cursor:
+            if shape is not None:
+                dx, dy = shape.extent.width, shape.extent.height
+                break
+    if not dx or not dy:
+        return None
+
+    cells = arcpy.da.FeatureClassToNumPyArray(
+        fc, ["OID@", "SHAPE@X", "SHAPE@Y", "SHAPE@AREA", "SHAPE@LENGTH"], skip_nulls=True
+    )
+    tol = 1e-3 * min(dx, dy)
+    x_first = cells["SHAPE@X"].min()
+    y_first = cells["SHAPE@Y"].min()
+
+    # Centroids on the (dx, dy) lattice and a dx × dy rectangle's area and
+    # perimeter for every cell
+    cols = np.rint((cells["SHAPE@X"] - x_first) / dx).astype(np.int64)
+    rows = np.rint((cells["SHAPE@Y"] - y_first) / dy).astype(np.int64)
+    if (
+        np.abs(x_first + cols * dx - cells["SHAPE@X"]).max() > tol
+        or np.abs(y_first + rows * dy - cells["SHAPE@Y"]).max() > tol
+        or np.abs(cells["SHAPE@AREA"] - dx * dy).max() > tol * (dx + dy)
+        or np.abs(cells["SHAPE@LENGTH"] - 2 * (dx + dy)).max() > 4 * tol
+    ):
+        return None
+
+    n_cols = int(cols.max()) + 1
+    n_rows = int(rows.max()) + 1
+    if n_cols * n_rows > 4 * cells.size:
+        return None                                 # too sparse for a dense lookup
+
+    x0 = np.mean(cells["SHAPE@X"] - cols * dx) - dx / 2
+    y0 = np.mean(cells["SHAPE@Y"] - rows * dy) - dy / 2
+
+    # One cell per lattice node
+    lattice = np.full((n_rows, n_cols), -1, dtype=np.int64)
+    lattice[rows, cols] = cells["OID@"]
+    if np.count_nonzero(lattice >= 0) != cells.size:
+        return None                                 # overlapping cells
+    return x0, y0, dx, dy, lattice
 
 try:
     # ----------------------------------------------------------------------
@@ -18,6 +75,8 @@ try:
     # ----------------------------------------------------------------------
     landscape_fl = arcpy.GetParameterAsText(0)          # point feature layer
     grid_fl = arcpy.GetParameterAsText(1)               # analytical grid
+    # grid_id_field is read to keep the toolbox parameter order; results are
+    # joined on the grid ObjectID (OID@), so the field itself is not used
     grid_id_field = arcpy.GetParameterAsText(2)         # grid ID field
     null_handling_mode = arcpy.GetParameterAsText(3)    # handling of empty grid cells
 
@@ -49,17 +108,16 @@ try:
     # ----------------------------------------------------------------------
     # WORKSPACE, PREFIX, FIELDS AND INTERMEDIATE DATASETS
     # ----------------------------------------------------------------------
-    workspace_gdb = arcpy.Describe(landscape_fl).path
     #prefix = arcpy.Describe(landscape_fl).baseName[:3].upper()
     desc_land = arcpy.Describe(landscape_fl)        # get the layer's metadata
+    workspace_gdb = desc_land.path
     base_name = desc_land.name                      # FC name without the path
     prefix = arcpy.ValidateTableName(
         base_name[:3].upper(),                      # first 3 letters in uppercase
         workspace_gdb                               # validate for the target geodatabase
     )
 
-    stat_zone_field_ID = "StatZoneID"
-    intersect_fc = f"{workspace_gdb}\\{prefix}_Ne_Int"
+    intersect_fc = f"memory\\{prefix}_Ne_Int"
 
     # ----------------------------------------------------------------------
     # VALIDATE DATA FORMATS (BLOCK SHAPEFILES)
@@ -77,11 +135,6 @@ try:
     # ---------------------------------------------------------------------------
     # CHECK SPATIAL INTERSECTION OF EXTENTS
     # ---------------------------------------------------------------------------
-    # Recalculate extents
-    arcpy.AddMessage("Recalculating feature class extents...")
-    arcpy.management.RecalculateFeatureClassExtent(landscape_fl)
-    arcpy.management.RecalculateFeatureClassExtent(grid_fl)
-
     # Check if input layers contain features
     if int(arcpy.management.GetCount(landscape_fl)[0]) == 0:
         arcpy.AddError("Landscape features layer contains no features.")
@@ -91,9 +144,22 @@ try:
         arcpy.AddError("Analytical grid layer contains no features.")
         raise arcpy.ExecuteError
 
-    # Get updated extents
-    ext_land = arcpy.Describe(landscape_fl).extent
-    ext_grid = arcpy.Describe(grid_fl).extent
+    # Get extents, recalculating only those that are missing or empty.
+    # Edits only ever enlarge a stored extent, so a stale one can merely let
+    # the disjoint test below pass; it never rejects overlapping inputs.
+    def describe_with_extent(fc):
+        desc = arcpy.Describe(fc)
+        ext = desc.extent
+        if ext is None or not (ext.width > 0 or ext.height > 0):
+            arcpy.AddMessage(f"Recalculating feature class extent of '{desc.name}'...")
+            arcpy.management.RecalculateFeatureClassExtent(fc)
+            desc = arcpy.Describe(fc)
+        return desc
+
+    # (the grid Describe is kept for its spatial index flag and OID field name)
+    ext_land = describe_with_extent(landscape_fl).extent
+    desc_grid = describe_with_extent(grid_fl)
+    ext_grid = desc_grid.extent
 
     # Check spatial intersection of extents
     # Two extents intersect if they are NOT disjoint
@@ -116,7 +182,7 @@ try:
     std_output_index_alias = f"Std_{prefix}_P_Ne"
 
     # ----------------------------------------------------------------------
-    # FORCE REMOVAL OF LOCKS AND CLEAN INTERMEDIATE DATASETS
+    # FORCE REMOVAL OF LOCKS FROM INPUT DATASETS
     # ----------------------------------------------------------------------
     try:
         arcpy.AddMessage("Removing existing locks...")
@@ -125,16 +191,12 @@ try:
     except:
         pass
 
-    if arcpy.Exists(intersect_fc):
-        arcpy.management.Delete(intersect_fc)
-        arcpy.AddMessage(f"Removed leftover dataset: {intersect_fc}")
-
     # ----------------------------------------------------------------------
     # CHECK IF OUTPUT FIELDS ALREADY EXIST IN GRID TABLE
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Checking if the output fields already exist...")
-    existing_fields = [f.name.upper() for f in arcpy.ListFields(grid_fl)]
-    if output_index_name.upper() in existing_fields or std_output_index_name.upper() in existing_fields:
+    grid_fields = {f.name.upper() for f in arcpy.ListFields(grid_fl)}
+    if output_index_name.upper() in grid_fields or std_output_index_name.upper() in grid_fields:
         arcpy.AddError(
             f"Fields '{output_index_name.upper()}' and/or '{std_output_index_name.upper()}' "
             "already exist in the analytical grid. Remove these fields before re-running the tool."
@@ -142,107 +204,146 @@ try:
         raise Exception("Field name conflict – remove existing fields and try again.")
 
     # ----------------------------------------------------------------------
-    # 1. CREATE TEMPORARY STATISTICAL ZONE FIELD ID
+    # 1. ASSIGN each point the ObjectID of the grid cell it falls in
+    #    A point lying on a shared cell border is counted once for every
+    #    touching cell
     # ----------------------------------------------------------------------
-    arcpy.AddMessage(f"Creating temporary zone field: {stat_zone_field_ID}...")
-    if stat_zone_field_ID in [f.name for f in arcpy.ListFields(grid_fl)]:
-        arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-    arcpy.management.AddField(grid_fl, stat_zone_field_ID, "LONG")
-    arcpy.management.CalculateField(grid_fl, stat_zone_field_ID, f"!{grid_id_field}!", "PYTHON3")
+    grid_lattice = None
+    if desc_land.shapeType == "Point" and desc_grid.shapeType == "Polygon":
+        grid_lattice = regular_grid_lattice(grid_fl)
+
+    if grid_lattice is not None:
+        # Regular grid: the cell of every point follows from its coordinates
+        arcpy.AddMessage("Regular grid detected. Assigning points to grid cells by coordinates...")
+        x0, y0, dx, dy, lattice = grid_lattice
+        points = arcpy.da.FeatureClassToNumPyArray(
+            landscape_fl, ["SHAPE@X", "SHAPE@Y"],
+            spatial_reference=desc_grid.spatialReference, skip_nulls=True
+        )
+        xy_tol = desc_grid.spatialReference.XYTolerance or 0.0
+
+        def lattice_index(coords, origin, size):
+            # Cell index along one axis; points within the XY tolerance of a
+            # cell edge are flagged so they can also go to the lower neighbour
+            pos = (coords - origin) / size
+            nearest_edge = np.rint(pos)
+            on_edge = np.abs(pos - nearest_edge) <= xy_tol / size
+            return np.where(on_edge, nearest_edge, np.floor(pos)).astype(np.int64), on_edge
+
+        col, on_x = lattice_index(points["SHAPE@X"], x0, dx)
+        row, on_y = lattice_index(points["SHAPE@Y"], y0, dy)
+        on_xy = on_x & on_y
+        col = np.concatenate([col, col[on_x] - 1, col[on_y], col[on_xy] - 1])
+        row = np.concatenate([row, row[on_x], row[on_y] - 1, row[on_xy] - 1])
+
+        inside = (col >= 0) & (col < lattice.shape[1]) & (row >= 0) & (row < lattice.shape[0])
+        point_cells = lattice[row[inside], col[inside]]
+        point_cells = point_cells[point_cells >= 0]
+    else:
+        # The overlay probes the grid for every point; make sure it has a spatial index
+        if not desc_grid.hasSpatialIndex:
+            arcpy.AddMessage("Adding spatial index to the analytical grid...")
+            arcpy.management.AddSpatialIndex(grid_fl)
+
+        # PAIRWISE INTERSECT – the output holds points only (no grid geometry is copied)
+        arcpy.AddMessage("INTERSECTING landscape points with the analytical grid...")
+        # Limiting the processing extent to the grid drops points outside its
+        # envelope before any point-in-polygon test
+        with arcpy.EnvManager(extent=ext_grid):
+            arcpy.analysis.PairwiseIntersect([landscape_fl, grid_fl], intersect_fc, "ONLY_FID")
+
+        # FID_<grid> (the field of the second input) carries the grid ObjectID
+        grid_fid_field = [
+            f.name for f in arcpy.ListFields(intersect_fc) if f.name.upper().startswith("FID_")
+        ][-1]
+        point_cells = arcpy.da.TableToNumPyArray(intersect_fc, [grid_fid_field])[grid_fid_field]
 
     # ----------------------------------------------------------------------
-    # 2. SPATIAL JOIN – count points inside each grid cell
+    # 1.1. COUNT points inside each grid cell (Ne)
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("SPATIALLY JOINING landscape points with the analytical grid...")
-    arcpy.analysis.SpatialJoin(
-        grid_fl, landscape_fl, intersect_fc,
-        "JOIN_ONE_TO_ONE", "KEEP_ALL", "", "INTERSECT"
-    )
-    arcpy.management.AlterField(intersect_fc, "Join_Count", "Ne")
+    cell_fids, cell_counts = np.unique(point_cells, return_counts=True)
 
     # ----------------------------------------------------------------------
-    # 3. OPTIONAL: convert zeros to NULL if user wants to preserve empty cells
+    # 2. EMPTY CELLS according to user choice
+    #    Replace NULL with 0 → every grid cell is written, cells without points get Ne = 0
+    #    Keep NULL          → only cells with points are written; the rest stay NULL
     # ----------------------------------------------------------------------
-    if not use_zero_for_null:
-        arcpy.AddMessage("Replacing 0 values with NULL to preserve empty cells...")
-        with arcpy.da.UpdateCursor(intersect_fc, ["Ne"]) as cursor:
-            for row in cursor:
-                if row[0] == 0:
-                    row[0] = None
-                    cursor.updateRow(row)
+    if use_zero_for_null:
+        zone_ids = np.sort(arcpy.da.TableToNumPyArray(grid_fl, ["OID@"])["OID@"])
+        ne_values = np.zeros(zone_ids.size, dtype=cell_counts.dtype)
+        ne_values[np.searchsorted(zone_ids, cell_fids)] = cell_counts
+    else:
+        arcpy.AddMessage("Preserving empty cells as NULL...")
+        zone_ids = cell_fids
+        ne_values = cell_counts
 
     # ----------------------------------------------------------------------
-    # 4. SAFE MIN–MAX STANDARDIZATION FOR Ne
+    # 3. SAFE MIN–MAX STANDARDIZATION FOR Ne
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Standardizing Ne (Min–Max) with proper handling of empty cells...")
 
-    if "Ne_MIN_MAX" not in [f.name for f in arcpy.ListFields(intersect_fc)]:
-        arcpy.management.AddField(intersect_fc, "Ne_MIN_MAX", "DOUBLE")
-        arcpy.AddMessage("Added field 'Ne_MIN_MAX' for standardized values.")
-
-    ne_values = [row[0] for row in arcpy.da.SearchCursor(intersect_fc, ["Ne"]) if row[0] is not None]
-
-    if not ne_values:
+    # MIN and MAX are taken from the observed counts of cells with points
+    if cell_counts.size == 0:
         min_ne = 0
         max_ne = 0
         arcpy.AddWarning("No valid Ne values found. Setting MIN and MAX to 0.")
     else:
         if use_zero_for_null:
             min_ne = 0
-            max_ne = max(ne_values)
+            max_ne = int(cell_counts.max())
             arcpy.AddMessage(f"Using fixed MIN=0 and MAX={max_ne} for standardization (NULLs replaced with 0).")
         else:
-            min_ne = min(ne_values)
-            max_ne = max(ne_values)
+            min_ne = int(cell_counts.min())
+            max_ne = int(cell_counts.max())
             arcpy.AddMessage(f"Using observed MIN={min_ne} and MAX={max_ne} for standardization (NULLs preserved).")
 
-    with arcpy.da.UpdateCursor(intersect_fc, ["Ne", "Ne_MIN_MAX"]) as cursor:
-        if max_ne == min_ne:
-            arcpy.AddMessage(
-                "All Ne values are identical (MIN = MAX). "
-                "Skipping Min–Max standardization. Assigning 0 to all Ne_MIN_MAX."
-            )
-            for row in cursor:
-                row[1] = 0
-                cursor.updateRow(row)
-        else:
-            arcpy.AddMessage("Performing Min–Max standardization of Ne...")
-            for row in cursor:
-                value = row[0]
-                if value is None:
-                    row[1] = None  # Preserve NULL
-                else:
-                    row[1] = (value - min_ne) / (max_ne - min_ne) if not use_zero_for_null else value / max_ne
-                cursor.updateRow(row)
+    if max_ne == min_ne:
+        arcpy.AddMessage(
+            "All Ne values are identical (MIN = MAX). "
+            "Skipping Min–Max standardization. Assigning 0 to all Ne_MIN_MAX."
+        )
+    else:
+        arcpy.AddMessage("Performing Min–Max standardization of Ne...")
+
+    # Join array with the final output field names; with use_zero_for_null MIN is
+    # fixed at 0, so both modes share one formula and MIN = MAX yields 0
+    ne_join = np.empty(
+        zone_ids.size,
+        dtype=[("GRID_OID", "<i4"), (output_index_name, "<i4"), (std_output_index_name, "<f8")]
+    )
+    ne_join["GRID_OID"] = zone_ids
+    ne_join[output_index_name] = ne_values
+
+    range_ne = max_ne - min_ne
+    ne_join[std_output_index_name] = 0.0
+    np.divide(
+        ne_join[output_index_name] - min_ne, range_ne,
+        out=ne_join[std_output_index_name], where=range_ne != 0
+    )
 
     arcpy.AddMessage("Min–Max standardization completed successfully.")
 
     # ----------------------------------------------------------------------
-    # 5. JOIN RESULTS BACK TO THE GRID LAYER
+    # 4. JOIN RESULTS BACK TO THE GRID LAYER
     # ----------------------------------------------------------------------
     arcpy.AddMessage("Joining results back to the analytical grid...")
-    arcpy.management.JoinField(grid_fl, stat_zone_field_ID, intersect_fc, stat_zone_field_ID, ["Ne", "Ne_MIN_MAX"])
+    # ExtendTable appends both columns in place under their final names
+    # (checked for conflicts above)
+    arcpy.da.ExtendTable(grid_fl, desc_grid.OIDFieldName, ne_join, "GRID_OID")
 
     # ----------------------------------------------------------------------
-    # 6. RENAME JOINED FIELDS
+    # 5. SET ALIASES OF THE JOINED FIELDS
     # ----------------------------------------------------------------------
-    arcpy.management.AlterField(grid_fl, "Ne", output_index_name, output_index_alias)
-    arcpy.management.AlterField(grid_fl, "Ne_MIN_MAX", std_output_index_name, std_output_index_alias)
+    arcpy.management.AlterField(grid_fl, output_index_name, new_field_alias=output_index_alias)
+    arcpy.management.AlterField(grid_fl, std_output_index_name, new_field_alias=std_output_index_alias)
 
     # ----------------------------------------------------------------------
-    # 7. CLEANUP
+    # 6. CLEANUP
     # ----------------------------------------------------------------------
-    arcpy.AddMessage("Removing temporary zone field...")
-    arcpy.management.DeleteField(grid_fl, stat_zone_field_ID)
-
     arcpy.AddMessage("Cleaning intermediate datasets...")
     if arcpy.Exists(intersect_fc):
         arcpy.management.Delete(intersect_fc)
 
-    arcpy.ClearWorkspaceCache_management()
-    if workspace_gdb.endswith(".gdb"):
-        arcpy.management.Compact(workspace_gdb)
-
     arcpy.AddMessage("P_Ne calculation completed successfully.")
 
 except arcpy.ExecuteError: